@@ -1,15 +1,26 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Path
 from fastapi.responses import FileResponse
 
 from .wrapper import Torrent, TorrentSearchApi
 
+api_client = TorrentSearchApi()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    yield
+    await api_client.shutdown()  # Close the headless browser
+
+
 app = FastAPI(
     title="TorrentSearch FastAPI",
     description="FastAPI server for TorrentSearch API.",
+    lifespan=lifespan,
 )
 
-api_client = TorrentSearchApi()
-
 
 @app.get("/", summary="Health Check", tags=["General"], response_model=dict[str, str])
 async def health_check() -> dict[str, str]:
@@ -1,4 +1,6 @@
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from copy import deepcopy
 from os import getenv
 from typing import Any
@@ -12,10 +14,17 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("TorrentSearch")
 
-mcp: FastMCP[Any] = FastMCP("TorrentSearch Tool")
-
 torrent_search_api = TorrentSearchApi()
 
+
+@asynccontextmanager
+async def lifespan(_server: FastMCP[Any]) -> AsyncIterator[None]:
+    yield
+    await torrent_search_api.shutdown()  # Close the headless browser
+
+
+mcp: FastMCP[Any] = FastMCP("TorrentSearch Tool", lifespan=lifespan)
+
 INCLUDE_LINKS = str(getenv("INCLUDE_LINKS")).lower() == "true"
 SOURCES = torrent_search_api.available_sources()
 
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from ygg_torrent import ygg_api
+
+from .wrapper import TorrentSearchApi, api_client
+
+
+@pytest.mark.asyncio
+async def test_search_torrents_caches_ygg(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test searching YGG Torrent once per query, within the cache TTL."""
+    calls: list[str] = []
+
+    def search_torrents(query: str) -> list[SimpleNamespace]:
+        calls.append(query)
+        data: dict[str, Any] = dict(
+            id=42, filename="Berserk", size="1.4 GB", seeders=150, date="2024-01-01"
+        )
+        return [SimpleNamespace(model_dump=lambda: data)]
+
+    monkeypatch.setattr(api_client, "SOURCES", ["yggtorrent"])
+    monkeypatch.setattr(api_client, "SEARCH_CACHE_TTL", 300)
+    monkeypatch.setattr(api_client, "_ygg_cache", {})  # Empty, never expiring
+    monkeypatch.setattr(ygg_api, "search_torrents", search_torrents)
+    client = TorrentSearchApi()
+    first = await client.search_torrents("berserk")
+    second = await client.search_torrents("Berserk", max_items=5)
+    assert calls == ["berserk"]
+    assert first[0].id.endswith("-10-yggtorrent-42")
+    assert second[0].id.endswith("-5-yggtorrent-42")  # Not prefixed twice
+
+    monkeypatch.setattr(api_client, "SEARCH_CACHE_TTL", 0)
+    await client.search_torrents("berserk")
+    assert calls == ["berserk", "berserk"]
@@ -0,0 +1,188 @@
+from asyncio import gather, sleep
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from .wrapper import Torrent, scraper
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = {  # Source -> (page, as crawled; parsed text, as expected)
+    "thepiratebay.org": ("thepiratebay.html", "thepiratebay.csv"),
+    "nyaa.si": ("nyaa.md", "nyaa.csv"),
+}
+
+
+def read_fixture(name: str) -> str:
+    """Read a fixture file, without its final newline."""
+    return (FIXTURES / name).read_text(encoding="utf-8").rstrip("\n")
+
+
+def sample_torrent(filename: str = "Berserk") -> Torrent:
+    """Create a torrent as found by a search."""
+    return Torrent.format(
+        filename=filename,
+        size="1.4 GB",
+        seeders="150",
+        leechers="10",
+        date="2024-01-01 10:00",
+        magnet_link="magnet:?xt=urn:btih:5a2b8c1d",
+        source="nyaa.si",
+    )
+
+
+@pytest.mark.parametrize("source", PAGES)
+def test_parse_result(source: str) -> None:
+    """Test parsing a page, from its results table only."""
+    page, parsed = PAGES[source]
+    assert scraper.parse_result(read_fixture(page), source) == read_fixture(parsed)
+
+
+def test_parse_result_with_padded_header() -> None:
+    """Test finding the results table despite a padded header."""
+    page = read_fixture("nyaa.md").replace("Category | Name |", "Category  |  Name  |")
+    assert scraper.parse_result(page, "nyaa.si") == read_fixture("nyaa.csv")
+
+
+def test_parse_result_without_table() -> None:
+    """Test parsing a page without results table, kept as is."""
+    assert scraper.parse_result("No results found", "nyaa.si") == "No results found"
+
+
+def test_parse_result_with_long_runs() -> None:
+    """Test parsing long runs of spaces and digits in linear time."""
+    page = "No results found" + " " * 40000 + "1" * 40000 + "<> ()" * 10000
+    start = perf_counter()
+    text = scraper.parse_result(page, "nyaa.si")
+    assert perf_counter() - start < 1  # Quadratic backtracking takes seconds
+    assert text == "No results found " + "1" * 4983
+
+
+@pytest.mark.parametrize("source", PAGES)
+def test_extract_torrents(source: str) -> None:
+    """Test extracting torrents, as formatted one row at a time."""
+    headers, *lines = read_fixture(PAGES[source][1]).splitlines()
+    expected = [
+        Torrent.format(**dict(zip(headers.split(";"), line.split(";"))), source=source)
+        for line in lines
+    ]
+    texts = [f"SOURCE -> {source}\n{read_fixture(PAGES[source][1])}"]
+    assert expected and scraper.extract_torrents(texts) == expected
+
+
+def test_extract_torrents_skips_invalid_rows() -> None:
+    """Test extracting torrents, omitting invalid and malformed rows."""
+    texts = [
+        "SOURCE -> nyaa.si\n"
+        "category;filename;magnet_link;size;date;seeders;leechers;downloads\n"
+        "Anime;Berserk - 01;magnet:?xt=1;1.4 GB;2024-01-01 10:00;150;10;3000\n"
+        "Anime;Berserk - 02;magnet:?xt=2;1.4 GB;2024-01-01 10:00;many;10;3000\n"
+        "Anime;Berserk - 03;magnet:?xt=3;1.4 GB\n"
+    ]
+    torrents = scraper.extract_torrents(texts)
+    assert [torrent.filename for torrent in torrents] == ["Berserk - 01"]
+
+
+async def sleep_no_time(_delay: float) -> None:
+    """Skip the backoff between attempts."""
+
+
+def fake_arun(
+    monkeypatch: pytest.MonkeyPatch, results: list[SimpleNamespace]
+) -> list[dict[str, Any]]:
+    """Fake page loads with the given results, recording their arguments."""
+    calls: list[dict[str, Any]] = []
+
+    async def arun(**kwargs: Any) -> SimpleNamespace:
+        calls.append(kwargs)
+        return results[len(calls) - 1]
+
+    monkeypatch.setattr(scraper.crawler, "arun", arun)
+    return calls
+
+
+@pytest.fixture
+def browser(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Fake the shared browser, recording its starts and closes."""
+    events: list[str] = []
+
+    async def start() -> None:
+        events.append("start")
+
+    async def close() -> None:
+        events.append("close")
+
+    monkeypatch.setattr(scraper, "_started", False)
+    monkeypatch.setattr(scraper.crawler, "start", start)
+    monkeypatch.setattr(scraper.crawler, "close", close)
+    monkeypatch.setattr(scraper, "sleep", sleep_no_time)
+    return events
+
+
+@pytest.mark.asyncio
+async def test_scrape_source_retries(
+    monkeypatch: pytest.MonkeyPatch, browser: list[str]
+) -> None:
+    """Test fetching a page until it succeeds, within the attempts limit."""
+    connected = SimpleNamespace(is_connected=lambda: True)
+    strategy: Any = scraper.crawler.crawler_strategy
+    monkeypatch.setattr(strategy.browser_manager, "browser", connected)
+    failure = SimpleNamespace(success=False, error_message="Timeout")
+    success = SimpleNamespace(success=True, markdown=read_fixture("nyaa.md"))
+    calls = fake_arun(monkeypatch, [failure, failure, success])
+    data = scraper.WEBSITES["nyaa.si"]
+    assert await scraper.scrape_source("nyaa.si", data, "berserk", 1) is None
+    assert len(calls) == 1
+
+    text = await scraper.scrape_source("nyaa.si", data, "berserk", 3)
+    assert text == f"SOURCE -> nyaa.si\n{read_fixture('nyaa.csv')}"
+    assert len(calls) == 3 and browser == ["start"]
+    assert calls[0]["config"].session_id == "nyaa.si"
+
+
+@pytest.mark.asyncio
+async def test_scrape_source_restarts_browser(
+    monkeypatch: pytest.MonkeyPatch, browser: list[str]
+) -> None:
+    """Test restarting the browser after it got disconnected."""
+    strategy: Any = scraper.crawler.crawler_strategy
+    monkeypatch.setattr(strategy.browser_manager, "browser", None)
+    failure = SimpleNamespace(success=False, error_message="Browser closed")
+    success = SimpleNamespace(success=True, markdown=read_fixture("nyaa.md"))
+    calls = fake_arun(monkeypatch, [failure, success])
+    data = scraper.WEBSITES["nyaa.si"]
+    assert await scraper.scrape_source("nyaa.si", data, "berserk", 2) is not None
+    assert len(calls) == 2 and browser == ["start", "close", "start"]
+
+
+@pytest.mark.asyncio
+async def test_search_torrents_coalesces(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test sharing one fetch between identical searches, caching found torrents."""
+    calls: list[str] = []
+
+    async def fetch_torrents(
+        query: str, sources: list[str] | None = None, max_retries: int = 1
+    ) -> list[Torrent]:
+        calls.append(query)
+        await sleep(0.01)
+        return [sample_torrent()] if query.startswith("berserk") else []
+
+    monkeypatch.setattr(scraper, "SEARCH_CACHE_TTL", 300)
+    monkeypatch.setattr(scraper, "_search_cache", {})  # Empty, never expiring
+    monkeypatch.setattr(scraper, "fetch_torrents", fetch_torrents)
+    results = await gather(
+        *(scraper.search_torrents(query) for query in ("berserk", "Berserk", "BERSERK"))
+    )
+    assert calls == ["berserk"] and not scraper._search_tasks
+    assert all(result == [sample_torrent()] for result in results)
+    assert results[0][0] is not results[1][0]  # Copies, leaving the cache intact
+
+    await scraper.search_torrents("berserk")
+    await scraper.search_torrents("berserk", ["nyaa.si"])  # Other sources
+    assert calls == ["berserk", "berserk"]
+
+    await gather(scraper.search_torrents("unknown"), scraper.search_torrents("unknown"))
+    await scraper.search_torrents("unknown")  # Found nothing, not cached
+    assert calls == ["berserk", "berserk", "unknown", "unknown"]
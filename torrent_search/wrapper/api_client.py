@@ -1,13 +1,17 @@
+import logging
+from asyncio import to_thread
 from os import getenv, makedirs
 from pathlib import Path
 from sys import argv
-from typing import Any
 
-from aiocache import cached
+from cachetools import TTLCache
 from ygg_torrent import ygg_api
 
 from .models import Cache, Torrent
-from .scraper import WEBSITES, search_torrents
+from .scraper import SEARCH_CACHE_TTL, WEBSITES, search_torrents
+from .scraper import shutdown as shutdown_scraper
+
+logger = logging.getLogger(__name__)
 
 PREFER_TORRENT_FILES: bool = str(getenv("PREFER_TORRENT_FILES")).lower() == "true"
 FOLDER_TORRENT_FILES: Path = Path(getenv("FOLDER_TORRENT_FILES") or "./torrents")
@@ -27,14 +31,34 @@ if excluded_sources := getenv("EXCLUDE_SOURCES"):
     SOURCES = [source for source in SOURCES if source not in EXCLUDE_SOURCES]
 
 
-def key_builder(
-    _namespace: str, _fn: Any, *args: tuple[Any], **kwargs: dict[str, Any]
-) -> str:
-    key = {
-        "query": args[0] if len(args) > 0 else "",
-        "max_items": args[1] if len(args) > 1 else 10,
-    } | kwargs
-    return str(key)
+_ygg_cache: TTLCache = TTLCache(
+    maxsize=256, ttl=max(SEARCH_CACHE_TTL, 1)
+)  # Found YGG torrents by query, as scraped ones
+
+
+async def search_ygg_torrents(query: str) -> list[Torrent]:
+    """
+    Search for torrents on YGG Torrent, off the event loop.
+    Found torrents are cached for SEARCH_CACHE_TTL seconds, if enabled.
+
+    Args:
+        query: Search query.
+
+    Returns:
+        A list of fresh copies of the found torrents.
+    """
+    key = query.casefold()
+    found_torrents: tuple[Torrent, ...] | None = (
+        _ygg_cache.get(key) if SEARCH_CACHE_TTL > 0 else None
+    )
+    if found_torrents is None:
+        found_torrents = tuple(
+            Torrent.format(**torrent.model_dump(), source="yggtorrent")
+            for torrent in await to_thread(ygg_api.search_torrents, query)
+        )
+        if found_torrents and SEARCH_CACHE_TTL > 0:
+            _ygg_cache[key] = found_torrents
+    return [torrent.model_copy() for torrent in found_torrents]  # Ids get prefixed
 
 
 class TorrentSearchApi:
@@ -46,7 +70,6 @@ class TorrentSearchApi:
         """Get the list of available torrent sources."""
         return SOURCES
 
-    @cached(ttl=300, key_builder=key_builder)  # type: ignore[untyped-decorator] # 5min
     async def search_torrents(
         self,
         query: str,
@@ -66,12 +89,7 @@ class TorrentSearchApi:
         if any(source != "yggtorrent" for source in SOURCES):
             found_torrents.extend(await search_torrents(query, SOURCES))
         if "yggtorrent" in SOURCES:
-            found_torrents.extend(
-                [
-                    Torrent.format(**torrent.model_dump(), source="yggtorrent")
-                    for torrent in ygg_api.search_torrents(query)
-                ]
-            )
+            found_torrents.extend(await search_ygg_torrents(query))
 
         found_torrents = list(
             sorted(
@@ -103,7 +121,7 @@ class TorrentSearchApi:
         try:
             query, max_items, source, ref_id = Torrent.extract_info(torrent_id)
         except Exception:
-            print(f"Invalid torrent ID: {torrent_id}")
+            logger.warning("Invalid torrent ID: %s", torrent_id)
             return None
 
         if source == "yggtorrent":
@@ -155,6 +173,10 @@ class TorrentSearchApi:
                 return found_torrent.magnet_link
         return None
 
+    async def shutdown(self) -> None:
+        """Close the headless browser used to scrape torrent sources."""
+        await shutdown_scraper()
+
 
 if __name__ == "__main__":
 
@@ -164,12 +186,15 @@ if __name__ == "__main__":
             print("Please provide a search query.")
             exit(1)
         client = TorrentSearchApi()
-        torrents: list[Torrent] = await client.search_torrents(query, max_items=5)
-        if torrents:
-            for torrent in torrents:
-                print(await client.get_magnet_link_or_torrent_file(torrent.id))
-        else:
-            print("No torrents found")
+        try:
+            torrents: list[Torrent] = await client.search_torrents(query, max_items=5)
+            if torrents:
+                for torrent in torrents:
+                    print(await client.get_magnet_link_or_torrent_file(torrent.id))
+            else:
+                print("No torrents found")
+        finally:
+            await client.shutdown()  # Close the headless browser
 
     from asyncio import run
 
@@ -2,7 +2,7 @@ from hashlib import sha256
 from time import time
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationInfo, model_validator
 
 from .utils import Compress62
 
@@ -21,26 +21,37 @@ class Torrent(BaseModel):
     uploader: str | None = None
     source: str | None = None
 
+    @model_validator(mode="before")
     @classmethod
-    def format(cls, **data: Any) -> "Torrent":
-        data["id"] = (
-            data["source"]
-            + "-"
-            + str(
-                data.get("id")
-                or (
-                    sha256(data["magnet_link"].encode()).hexdigest()[:10]
-                    if data.get("magnet_link")
-                    else "none"
+    def normalize(cls, data: Any, info: ValidationInfo) -> Any:
+        if not isinstance(data, dict) or not (info.context or {}).get("format"):
+            return data  # Only raw scraped data is normalized, see `format`
+        data = dict(data)
+        try:
+            data["id"] = (
+                data["source"]
+                + "-"
+                + str(
+                    data.get("id")
+                    or (
+                        sha256(data["magnet_link"].encode()).hexdigest()[:10]
+                        if data.get("magnet_link")
+                        else "none"
+                    )
                 )
             )
-        )
-        data["filename"] = data["filename"].strip()
+            data["filename"] = data["filename"].strip()
+            data["date"] = data["date"][:10]
+        except (KeyError, AttributeError, TypeError) as e:
+            raise ValueError(f"Invalid torrent data: {e!r}") from e
         data["seeders"] = int(data["seeders"]) if data.get("seeders") else 0
         data["leechers"] = int(data["leechers"]) if data.get("leechers") else 0
         data["downloads"] = int(data["downloads"]) if data.get("downloads") else None
-        data["date"] = data["date"][:10]
-        return cls(**data)
+        return data
+
+    @classmethod
+    def format(cls, **data: Any) -> "Torrent":
+        return cls.model_validate(data, context={"format": True})
 
     def prepend_info(self, query: str, max_items: int) -> None:
         self.id = f"{Compress62.compress(query)}-{max_items}-{self.id}"
@@ -1,10 +1,17 @@
+import logging
 import re
 import warnings
+from asyncio import Lock, Task, create_task, gather, shield, sleep
+from collections.abc import Callable, Mapping
+from contextlib import suppress
+from functools import partial
+from os import getenv
 from time import time
 from typing import Any
 from urllib.parse import quote
 
-from pydantic import ValidationError
+from cachetools import TTLCache
+from pydantic import OnErrorOmit, TypeAdapter
 
 from .models import Torrent
 
@@ -19,6 +26,8 @@ from crawl4ai.markdown_generation_strategy import (  # noqa: E402 wrong-import-o
     DefaultMarkdownGenerator,
 )
 
+logger = logging.getLogger(__name__)
+
 # Crawler Configuration
 BROWSER_CONFIG = BrowserConfig(
     browser_type="chromium",
@@ -44,40 +53,31 @@ DEFAULT_CRAWLER_RUN_CONFIG = CrawlerRunConfig(
 )
 
 # Websites Configuration
+# Runs of spaces or digits are only matched from their start, keeping scans linear
 FILTERS: dict[str, re.Pattern[str]] = {
-    "full_links": re.compile(
-        r"(http|https|ftp):[/]{1,2}[a-zA-Z0-9.]+[a-zA-Z0-9./?=+~_\-@:%#&]*"
-    ),
-    "backslashes": re.compile(r"\\"),
+    "full_links": re.compile(r"(?:https?|ftp)://?[\w./?=+~\-@:%#&]*"),
     "local_links": re.compile(
         r"(a href=)*(<|\")\/[a-zA-Z0-9./?=+~()_\-@:%#&]*(>|\")* *"
     ),
-    "some_texts": re.compile(r' *"[a-zA-Z ]+" *'),
-    "empty_angle_brackets": re.compile(r" *< *> *"),
-    "empty_curly_brackets": re.compile(r" *\{ *\} *"),
-    "empty_parenthesis": re.compile(r" *\( *\) *"),
-    "empty_brackets": re.compile(r" *\[ *\] *"),
+    "some_texts": re.compile(r'(?:(?<! ) +)?"[a-zA-Z ]+" *'),
+    "empty_containers": re.compile(r"(?:(?<! ) +)?(?:< *>|\{ *\}|\( *\)|\[ *\]) *"),
     "tags": re.compile(r"(>?<(img|a) ((alt|src)=)+)|(<a href=\")"),
     "date": re.compile(r'<label title=("[a-zA-Z0-9()+: ]+"|>)'),
 }
-REPLACERS: dict[str, tuple[re.Pattern[str], str]] = {
-    "weird_spaces": (re.compile(r"\u00A0"), " "),
+# Literal patterns (str) are replaced as is, without regex
+REPLACERS: dict[str, tuple[re.Pattern[str] | str, str]] = {
     "spans": (re.compile(r"</?span>"), " | "),
-    "weird spaced bars": (re.compile(r" *\|[ \|]+"), " | "),
+    "weird spaced bars": (re.compile(r"(?:(?<! ) +)?\|[ \|]+"), " | "),
     "double_quotes": (re.compile(r'"[" ]+'), ""),
-    "single_angle_bracket": (re.compile(r"<|>"), ""),
+    "single_angle_bracket": (re.compile(r"[<>]"), ""),
     "thepiratebay_labels": (
         re.compile(r"Category.*?ULed by", re.DOTALL),
         "category | filename | date | magnet_link | size | seeders | leechers | uploader",
     ),
     "thepiratebay_magnet_fix": (
-        re.compile(r"announce\|"),
+        re.compile(r'announce"? ?\|'),
         "announce |",
     ),
-    "nyaa_remove_click_here_line": (
-        re.compile(r"^\[Click here.*?\]\n"),
-        "",
-    ),
     "nyaa_header_block": (
         re.compile(r"Category \| Name \| Link \|Size \|Date \|\s*\r?\n[\|-]+\s*\r?\n"),
         "category | filename | magnet_link | size | date | seeders | leechers | downloads\n",
@@ -94,106 +94,292 @@ REPLACERS: dict[str, tuple[re.Pattern[str], str]] = {
         re.compile(r"\|\((magnet:\?[^)]+)\)"),
         r"| \1",
     ),
-    "gt": (re.compile("&gt;"), " -"),
-    "amp": (re.compile("&amp;"), "&"),
+    "gt": ("&gt;", " -"),
+    "amp": ("&amp;", "&"),
     "bad_starting_spaced_bars": (re.compile(r"\n[\| ]+"), "\n"),
-    "bad_ending_spaces": (re.compile(r" +\n"), "\n"),
-    "duplicated_spaces": (re.compile(r" {2,4}"), " "),
-    "size": (re.compile(r"([\d.]+[\s ]?[KMG])i?B"), r"\1B"),
+    "bad_ending_spaces": (re.compile(r"(?<! ) +\n"), "\n"),
+    "duplicated_newlines": (re.compile(r"\n{2,}"), "\n"),
+    "duplicated_spaces": (re.compile(r" {2,}"), " "),
+    "size": (re.compile(r"(?<![\d.])([\d.]+[\s ]?[KMG])i?B"), r"\1B"),
     "to_csv": (re.compile(r" \| *"), ";"),
 }
-WEBSITES: dict[str, dict[str, str | list[str]]] = {
+# Literals a replacer needs to match, checked before running its regex (else always run)
+SENTINELS: dict[str, str] = {
+    "thepiratebay_labels": "ULed by",
+    "nyaa_header_block": "Category | Name | Link",
+}
+WEBSITES: dict[str, dict[str, str | frozenset[str]]] = {
     "thepiratebay.org": dict(
         search="https://thepiratebay.org/search.php?q={query}",
         parsing="html",
-        exclude_patterns=[],
+        exclude_patterns=frozenset(),
+        table_end="</ol>",
     ),
     "nyaa.si": dict(
         search="https://nyaa.si/?f=0&c=0_0&q={query}&s=seeders&o=desc",
         parsing="markdown",
-        exclude_patterns=["local_links"],
+        exclude_patterns=frozenset({"local_links"}),
+        table_start=r"Category[\s|]+Name[\s|]+Link",
+        table_end="\n\n",
     ),
     "sukebei.nyaa.si": dict(
         search="https://sukebei.nyaa.si/?f=0&c=0_0&q={query}&s=seeders&o=desc",
         parsing="markdown",
-        exclude_patterns=["local_links"],
+        exclude_patterns=frozenset({"local_links"}),
+        table_start=r"Category[\s|]+Name[\s|]+Link",
+        table_end="\n\n",
     ),
 }
+SITE_PREFIXES: tuple[str, ...] = ("thepiratebay", "nyaa")  # Site-specific patterns
+HTML_ONLY: tuple[str, ...] = ("tags", "date", "spans")  # Skipped on markdown parsing
+
+
+def applies_to(name: str, source: str) -> bool:
+    """
+    Check if a filter or replacer applies to a source.
+    Names prefixed by a site (e.g. `nyaa_`) only apply to the matching sources,
+    and HTML-only ones only to sources parsed as HTML.
+
+    Args:
+        name: The name of the filter or replacer.
+        source: The source to check against.
+
+    Returns:
+        True if it applies to the source, else False.
+    """
+    if name in WEBSITES[source].get("exclude_patterns", frozenset()):
+        return False
+    if name in HTML_ONLY and WEBSITES[source]["parsing"] != "html":
+        return False
+    prefix = name.split("_", 1)[0]
+    return prefix not in SITE_PREFIXES or prefix in source.split(".")
+
+
+def build_pipeline(source: str) -> tuple[tuple[re.Pattern[str] | str, str, str], ...]:
+    """
+    Build the parsing pipeline of a source, skipping what doesn't apply to it.
+
+    Args:
+        source: The source to build the pipeline for.
+
+    Returns:
+        The (pattern, replacement, sentinel) triplets to apply in order.
+    """
+    pipeline: list[tuple[re.Pattern[str] | str, str, str]] = [
+        (pattern, "", "")
+        for name, pattern in FILTERS.items()
+        if applies_to(name, source)
+    ]
+    for name, (pattern, replacement_str) in REPLACERS.items():
+        if applies_to(name, source):
+            pipeline.append((pattern, replacement_str, SENTINELS.get(name, "")))
+    return tuple(pipeline)
+
+
+SEARCH_URLS: dict[str, Callable[[Mapping[str, str]], str]] = {
+    source: str(data["search"]).format_map for source, data in WEBSITES.items()
+}  # Bound URL templates, avoiding per-query lookups
+PIPELINES: dict[str, tuple[tuple[re.Pattern[str] | str, str, str], ...]] = {
+    source: build_pipeline(source) for source in WEBSITES
+}
+TABLE_STARTS: dict[str, re.Pattern[str]] = {
+    source: re.compile(str(data["table_start"]))
+    for source, data in WEBSITES.items()
+    if "table_start" in data
+}  # Table headers, tolerant to their padding on the raw page
+CRAWLER_RUN_CONFIGS: dict[str, CrawlerRunConfig] = {
+    source: DEFAULT_CRAWLER_RUN_CONFIG.clone(  # type: ignore[no-untyped-call]
+        session_id=source
+    )
+    for source in WEBSITES
+}  # One browser session per source, reusing its page across searches
+
+TORRENTS_ADAPTER: TypeAdapter[list[Torrent]] = TypeAdapter(
+    list[OnErrorOmit[Torrent]]
+)  # Batch validation, skipping invalid rows
 
 crawler = AsyncWebCrawler(config=BROWSER_CONFIG, always_bypass_cache=True)
+_started = False
+_crawler_lock = Lock()
+_session_locks: dict[str, Lock] = {source: Lock() for source in WEBSITES}
+
+SEARCH_CACHE_TTL: int = int(getenv("SEARCH_CACHE_TTL") or 300)  # 0 to disable
+_search_cache: TTLCache = TTLCache(  # type: ignore[no-untyped-call]
+    maxsize=256, ttl=max(SEARCH_CACHE_TTL, 1)
+)  # Found torrents by (query, sources)
+_search_tasks: dict[tuple[str, tuple[str, ...]], Task[list[Torrent]]] = {}
+
+
+async def _ensure_started() -> None:
+    """Start the shared browser once, on first use."""
+    global _started
+    async with _crawler_lock:
+        if not _started:
+            await crawler.start()  # type: ignore[no-untyped-call]
+            _started = True
+
+
+async def _reset_if_disconnected() -> None:
+    """Close the shared browser if it crashed or got disconnected, to restart it."""
+    global _started
+    strategy: Any = crawler.crawler_strategy
+    async with _crawler_lock:
+        browser = strategy.browser_manager.browser
+        if _started and not (browser and browser.is_connected()):
+            logger.warning("Browser disconnected, restarting it")
+            with suppress(Exception):  # Whatever is left of it
+                await crawler.close()  # type: ignore[no-untyped-call]
+            _started = False
+
+
+async def shutdown() -> None:
+    """Close the shared browser, if started."""
+    global _started
+    async with _crawler_lock:
+        if _started:
+            await crawler.close()  # type: ignore[no-untyped-call]
+            _started = False
+
+
+def cut_table(text: str, source: str) -> str:
+    """
+    Cut a raw page down to its results table, before any parsing.
+
+    Args:
+        text: The raw page.
+        source: The source of the page, giving the bounds of its table.
+
+    Returns:
+        The text from the table header to the table end, or as is without table.
+    """
+    if table_start := TABLE_STARTS.get(source):
+        if not (match := table_start.search(text)):
+            return text
+        text = text[match.start() :]
+    table_end = str(WEBSITES[source].get("table_end", ""))
+    if table_end and (end := text.find(table_end)) != -1:
+        text = text[:end]
+    return text
 
 
-def parse_result(
-    text: str, exclude_patterns: list[str] | None = None, max_chars: int = 5000
-) -> str:
+def parse_result(text: str, source: str, max_chars: int = 5000) -> str:
     """
     Parse the text result.
 
     Args:
         text: The text to parse.
-        exclude_patterns: List of patterns to exclude.
+        source: The source of the text, selecting its parsing pipeline.
         max_chars: Maximum number of characters to return.
 
     Returns:
         The parsed text.
     """
-    text = text.split("<li>", 1)[-1].replace("<li>", "")
-    for name, pattern in FILTERS.items():
-        if exclude_patterns and name in exclude_patterns:
-            continue
-        text = pattern.sub("", text)
-    for name, replacer_config in REPLACERS.items():
-        if exclude_patterns and name in exclude_patterns:
+    text = (
+        cut_table(text.split("<li>", 1)[-1], source)
+        .replace("<li>", "")
+        .replace("\u00a0", " ")  # Weird spaces
+        .replace("\\", "")  # Backslashes
+    )
+    for pattern, replacement_str, sentinel in PIPELINES[source]:
+        if sentinel not in text:  # Cannot match, skip the scan
             continue
-        pattern, replacement_str = replacer_config
-        text = pattern.sub(replacement_str, text)
-    if len(text) > max_chars:
-        safe_truncate_pos = text.rfind("\n", 0, max_chars)
-        if safe_truncate_pos == -1:
-            text = text[:max_chars]
-        else:
-            text = text[:safe_truncate_pos]
-    text = re.sub(r"\n{2,}", "\n", text)
+        text = (
+            text.replace(pattern, replacement_str)
+            if isinstance(pattern, str)
+            else pattern.sub(replacement_str, text)
+        )
+    if len(text) > max_chars:  # Truncate on the last full line, if any
+        truncated_text = text[:max_chars]
+        head, newline, _ = truncated_text.rpartition("\n")
+        text = head if newline else truncated_text
     return text.strip()
 
 
-async def scrape_torrents(query: str, sources: list[str] | None = None) -> list[str]:
+async def scrape_source(
+    source: str, data: dict[str, str | frozenset[str]], query: str, max_retries: int = 1
+) -> str | None:
+    """
+    Scrape torrents from a single source.
+
+    Args:
+        source: The source to scrape from.
+        data: The source configuration.
+        query: Search query.
+        max_retries: Maximum number of attempts to fetch the page.
+
+    Returns:
+        The text result prefixed with its source, or None on failure.
+    """
+    url = SEARCH_URLS[source]({"query": quote(query)})
+    for attempt in range(1, max_retries + 1):
+        try:
+            await _ensure_started()
+            async with _session_locks[source]:  # A session page loads one URL at a time
+                crawl_result: Any = await crawler.arun(
+                    url=url, config=CRAWLER_RUN_CONFIGS[source]
+                )
+            if crawl_result.success:
+                break
+            error = crawl_result.error_message
+        except Exception as e:
+            error = str(e)
+        logger.warning(
+            "Error scraping %s for query '%s' at %s: %s (Attempt %d/%d)",
+            source,
+            query,
+            url,
+            error,
+            attempt,
+            max_retries,
+        )
+        await _reset_if_disconnected()
+        if attempt < max_retries:
+            await sleep(2 ** (attempt - 1))  # Exponential backoff
+    else:
+        return None
+    try:
+        processed_text = parse_result(
+            (
+                crawl_result.cleaned_html
+                if data["parsing"] == "html"
+                else crawl_result.markdown
+            ),
+            source,
+        )
+        return f"SOURCE -> {source}\n{processed_text}"
+    except Exception:
+        logger.exception("Error parsing %s for query '%s'", source, query)
+    return None
+
+
+async def scrape_torrents(
+    query: str, sources: list[str] | None = None, max_retries: int = 1
+) -> list[str]:
     """
     Scrape torrents from ThePirateBay and Nyaa.
+    Sources are scraped concurrently, sharing the same persistent browser.
 
     Args:
         query: Search query.
         sources: List of valid sources to scrape from.
+        max_retries: Maximum number of attempts per source.
 
     Returns:
         A list of text results.
     """
-    results_list = []
-    async with crawler:
-        for source, data in WEBSITES.items():
-            if sources is None or source in sources:
-                url = str(data["search"]).format(query=quote(query))
-                try:
-                    crawl_result: Any = await crawler.arun(
-                        url=url, config=DEFAULT_CRAWLER_RUN_CONFIG
-                    )
-                    processed_text = parse_result(
-                        (
-                            crawl_result.cleaned_html
-                            if data["parsing"] == "html"
-                            else crawl_result.markdown
-                        ),
-                        list(data.get("exclude_patterns", [])),
-                    )
-                    results_list.append(f"SOURCE -> {source}\n{processed_text}")
-                except Exception as e:
-                    print(f"Error scraping {source} for query '{query}' at {url}: {e}")
-    return results_list
+    tasks = [
+        scrape_source(source, data, query, max_retries)
+        for source, data in WEBSITES.items()
+        if sources is None or source in sources
+    ]
+    results = await gather(*tasks, return_exceptions=True)
+    return [result for result in results if isinstance(result, str)]
 
 
 def extract_torrents(texts: list[str]) -> list[Torrent]:
     """
     Extract torrents from the parsed texts.
+    All rows are validated at once, invalid ones being skipped.
 
     Args:
         texts: The texts to extract torrents from.
@@ -201,25 +387,53 @@ def extract_torrents(texts: list[str]) -> list[Torrent]:
     Returns:
         A list of torrent results.
     """
-    torrents: list[Torrent] = []
+    rows: list[dict[str, str]] = []
     for text in texts:
         source, content = text.split("\n", 1)
-        if "No results" in content:
+        if not content or "No results" in content:
             continue
         source = source[10:]
         data = content.splitlines()
         headers = data[0].split(";")
+        max_split = len(headers) - 1
         for line in data[1:]:
-            try:
-                torrent = dict(zip(headers, line.split(";"))) | {"source": source}
-                torrents.append(Torrent.format(**torrent))
-            except ValidationError:
-                continue
-            except Exception:
+            values = line.split(";", max_split)
+            if len(values) != len(headers):  # Malformed row
                 continue
+            rows.append(dict(zip(headers, values), source=source))
+    return TORRENTS_ADAPTER.validate_python(rows, context={"format": True})
+
+
+async def fetch_torrents(
+    query: str,
+    sources: list[str] | None = None,
+    max_retries: int = 1,
+) -> list[Torrent]:
+    """
+    Scrape and extract torrents from ThePirateBay and Nyaa, bypassing the cache.
+
+    Args:
+        query: Search query.
+        sources: List of valid sources to scrape from.
+        max_retries: Maximum number of attempts per source.
+
+    Returns:
+        A list of torrent results.
+    """
+    start_time = time()
+    scraped_results: list[str] = await scrape_torrents(query, sources, max_retries)
+    torrents: list[Torrent] = extract_torrents(scraped_results)
+    logger.info("Successfully extracted results in %.2f sec.", time() - start_time)
     return torrents
 
 
+def _store_search(key: tuple[str, tuple[str, ...]], task: Task[list[Torrent]]) -> None:
+    """Release a finished search, caching its torrents unless it failed or got none."""
+    del _search_tasks[key]
+    if not task.cancelled() and task.exception() is None and task.result():
+        _search_cache[key] = tuple(task.result())
+
+
 async def search_torrents(
     query: str,
     sources: list[str] | None = None,
@@ -228,29 +442,29 @@ async def search_torrents(
     """
     Search for torrents on ThePirateBay and Nyaa.
     Corresponds to GET /torrents
+    Results are cached, and concurrent identical searches share a single scrape.
 
     Args:
         query: Search query.
         sources: List of valid sources to scrape from.
-        max_retries: Maximum number of retries.
+        max_retries: Maximum number of attempts per source.
 
     Returns:
         A list of torrent results.
     """
-    start_time = time()
-    scraped_results: list[str] = await scrape_torrents(query, sources=sources)
-    torrents: list[Torrent] = []
-    retries = 0
-    while retries < max_retries:
-        try:
-            torrents = extract_torrents(scraped_results)
-            print(f"Successfully extracted results in {time() - start_time:.2f} sec.")
-            return torrents
-        except Exception:
-            retries += 1
-            print(f"Failed to extract results: Attempt {retries}/{max_retries}")
-    print(
-        f"Exhausted all {max_retries} retries. "
-        f"Returning empty list. Total time: {time() - start_time:.2f} sec."
+    if SEARCH_CACHE_TTL <= 0:  # Cache disabled
+        return await fetch_torrents(query, sources, max_retries)
+    key = (
+        query.casefold(),
+        tuple(sorted(src for src in WEBSITES if sources is None or src in sources)),
     )
-    return torrents
+    cached_torrents = _search_cache.get(key)  # type: ignore[no-untyped-call]
+    if cached_torrents is None:
+        task = _search_tasks.get(key)
+        if task is None:  # No identical search in flight, start one
+            task = _search_tasks[key] = create_task(
+                fetch_torrents(query, sources, max_retries)
+            )
+            task.add_done_callback(partial(_store_search, key))
+        cached_torrents = tuple(await shield(task))  # Caller cancellation spares it
+    return [torrent.model_copy() for torrent in cached_torrents]  # Leave cache intact